@@ -0,0 +1,75 @@
+"""Buffered post view counters.
+
+- ViewCounter - accumulates views in process memory and flushes them in batches;
+- post_views - counter used by post_detail view.
+
+Every worker process keeps its own buffer and adds it to database values with
+``F()`` expressions, so counts stay correct with any number of workers.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import Case, F, FloatField, IntegerField, Value, When
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Posts updated by one statement, keeps query parameters within SQLite limit
+UPDATE_BATCH_SIZE = 100
+
+
+class ViewCounter:
+    """Count post views in memory and periodically write them to database.
+
+    Settings: BLOG_VIEWS_FLUSH_INTERVAL (seconds), BLOG_VIEWS_FLUSH_SIZE (distinct posts)
+    Methods: add, flush
+    """
+
+    def __init__(self):
+        """Create empty buffer."""
+        self.views = Counter()
+        self.lock = threading.Lock()
+        self.flushed_at = time.monotonic()
+
+    def add(self, post_pk):
+        """Count one view of a post, flush buffer when it is due."""
+        with self.lock:
+            self.views[post_pk] += 1
+            due = (len(self.views) >= getattr(settings, 'BLOG_VIEWS_FLUSH_SIZE', 1000) or
+                   time.monotonic() - self.flushed_at >= getattr(settings, 'BLOG_VIEWS_FLUSH_INTERVAL', 10))
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Add buffered views to view counts and popularity of posts."""
+        with self.lock:
+            views, self.views = self.views, Counter()
+            self.flushed_at = time.monotonic()
+        items = list(views.items())
+        try:
+            with transaction.atomic():
+                for start in range(0, len(items), UPDATE_BATCH_SIZE):
+                    update_views(items[start:start + UPDATE_BATCH_SIZE])
+        except DatabaseError:
+            logger.exception('Failed to flush post views, keeping them for the next flush')
+            with self.lock:
+                self.views.update(views)
+
+
+def update_views(items):
+    """Add views to posts with one UPDATE, items are (post pk, views) pairs."""
+    views = [When(pk=post_pk, then=Value(count)) for post_pk, count in items]
+    Post.objects.filter(pk__in=[post_pk for post_pk, _ in items]).update(
+        view_count=F('view_count') + Case(*views, output_field=IntegerField()),
+        popularity=F('popularity') + Case(*views, output_field=FloatField()))
+
+
+post_views = ViewCounter()
+atexit.register(post_views.flush)
@@ -0,0 +1 @@
+"""Management utilities for blog app."""
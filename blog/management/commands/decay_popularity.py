@@ -0,0 +1,75 @@
+"""Decay popularity of posts.
+
+- Command - multiplies popularity by a factor derived from its half-life.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from blog.models import Post, PopularityDecay
+
+# Popularity below this value is reset to zero, so such posts are not updated again
+MIN_POPULARITY = 0.01
+
+
+class Command(BaseCommand):
+    """Decay popularity of posts, run it periodically, e.g. hourly from cron.
+
+    Time passed since the previous run is stored in database, so missed, late
+    or extra runs still decay popularity by the right amount. Every batch saves
+    progress in the same transaction, so an interrupted run is finished by the
+    next one and concurrent runs share batches instead of repeating them.
+    """
+
+    help = 'Decay popularity of posts by time passed since the previous run.'
+
+    def add_arguments(self, parser):
+        """Describe command arguments."""
+        parser.add_argument('--batch-size', type=int, default=1000, dest='batch_size',
+                            help='Number of posts updated in one transaction.')
+
+    def handle(self, *args, **options):
+        """Finish interrupted run, if any, then decay by time passed since the previous run."""
+        count = self.decay(options['batch_size'])
+        hours = self.start()
+        count += self.decay(options['batch_size'])
+        self.stdout.write('Decayed popularity of {} posts by {:.2f} hours.'.format(count, hours))
+
+    def start(self):
+        """Remember decay factor for hours passed since the previous run, return the hours."""
+        with transaction.atomic():
+            decay, created = PopularityDecay.objects.select_for_update().get_or_create(pk=1)
+            if created or decay.factor is not None:
+                # First run only remembers its time, a concurrent run already started decay
+                return 0
+            now = timezone.now()
+            hours = max((now - decay.decayed_date).total_seconds() / 3600, 0)
+            decay.factor = 0.5 ** (hours / getattr(settings, 'BLOG_POPULARITY_HALF_LIFE', 24.0))
+            decay.last_pk = 0
+            decay.decayed_date = now
+            decay.save()
+        return hours
+
+    def decay(self, batch_size):
+        """Decay popularity by remembered factor in batches ordered by primary key, return number of posts."""
+        count = 0
+        while True:
+            with transaction.atomic():
+                decay = PopularityDecay.objects.select_for_update().filter(pk=1).first()
+                if decay is None or decay.factor is None:
+                    return count
+                pks = list(Post.objects.filter(popularity__gt=0, pk__gt=decay.last_pk).order_by('pk')
+                           .values_list('pk', flat=True)[:batch_size])
+                if pks:
+                    batch = Post.objects.filter(pk__in=pks)
+                    batch.update(popularity=F('popularity') * decay.factor)
+                    batch.filter(popularity__lt=MIN_POPULARITY).update(popularity=0)
+                    decay.last_pk = pks[-1]
+                else:
+                    decay.factor = None
+                    decay.last_pk = 0
+                decay.save()
+            count += len(pks)
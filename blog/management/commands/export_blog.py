@@ -0,0 +1,67 @@
+"""Export posts and comments as JSON Lines.
+
+- Command - streams rows chunk by chunk, posts first, then comments.
+"""
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from blog.models import Post, Comment
+
+POST_FIELDS = ('id', 'author__username', 'title', 'text', 'created_date', 'published_date', 'view_count',
+               'popularity')
+COMMENT_FIELDS = ('id', 'post_id', 'author', 'text', 'created_date', 'is_approved')
+
+
+class Command(BaseCommand):
+    """Write every alive post and its comments as one JSON object per line."""
+
+    help = 'Export posts and comments to JSON Lines.'
+
+    def add_arguments(self, parser):
+        """Describe command arguments."""
+        parser.add_argument('--output', default='-', dest='output',
+                            help='File to write to, "-" means stdout.')
+        parser.add_argument('--chunk-size', type=int, default=2000, dest='chunk_size',
+                            help='Number of rows loaded from database at once.')
+
+    def handle(self, *args, **options):
+        """Export posts, then comments."""
+        if options['output'] == '-':
+            self.export(self.stdout.write, options['chunk_size'])
+        else:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                self.export(lambda line: output.write(line + '\n'), options['chunk_size'])
+
+    def export(self, write_line, chunk_size):
+        """Pass every row encoded as JSON to write_line."""
+        posts = Post.objects.alive()
+        comments = Comment.objects.filter(post__deleted_date__isnull=True)
+        for kind, queryset, fields in (('post', posts, POST_FIELDS), ('comment', comments, COMMENT_FIELDS)):
+            for row in iterate_chunks(queryset.values(*fields), chunk_size):
+                row['type'] = kind
+                if kind == 'post':
+                    row['author'] = row.pop('author__username')
+                else:
+                    row['post'] = row.pop('post_id')
+                write_line(json.dumps(row, default=encode_date))
+
+
+def iterate_chunks(queryset, chunk_size):
+    """Iterate over queryset ordered by pk, loading one chunk at a time."""
+    last_pk = None
+    while True:
+        chunk = queryset.order_by('pk')
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+        yield from chunk
+        last_pk = chunk[-1]['id']
+
+
+def encode_date(value):
+    """Encode date with full precision, unlike DjangoJSONEncoder which drops microseconds."""
+    return value.isoformat()
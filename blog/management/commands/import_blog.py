@@ -0,0 +1,129 @@
+"""Import posts and comments from JSON Lines.
+
+- Command - reads lines written by export_blog and bulk creates rows in chunks.
+"""
+
+import json
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import IntegrityError, connections, transaction
+from django.utils.dateparse import parse_datetime
+
+from blog.models import Post, Comment
+
+
+class Command(BaseCommand):
+    """Load rows in chunks with ``bulk_create``, then render their HTML at once.
+
+    Rows keep their primary keys, so comments keep pointing to their posts.
+    Posts must precede their comments in the input, as export_blog writes them.
+    The whole import runs in one transaction, so a failed import leaves nothing
+    behind and the same file can be imported again after fixing the error.
+    """
+
+    help = 'Import posts and comments from JSON Lines.'
+
+    def add_arguments(self, parser):
+        """Describe command arguments."""
+        parser.add_argument('input', help='File to read from, "-" means stdin.')
+        parser.add_argument('--chunk-size', type=int, default=2000, dest='chunk_size',
+                            help='Number of rows created with one query.')
+        parser.add_argument('--workers', type=int, default=None, dest='workers',
+                            help='Number of processes rendering imported text.')
+
+    def handle(self, *args, **options):
+        """Import rows, reset sequences and render text of imported rows."""
+        try:
+            with transaction.atomic():
+                if options['input'] == '-':
+                    counts = self.load(sys.stdin, options['chunk_size'])
+                else:
+                    with open(options['input'], encoding='utf-8') as lines:
+                        counts = self.load(lines, options['chunk_size'])
+                self.reset_sequences()
+        except IntegrityError as error:
+            raise CommandError('Import failed: {!r}'.format(error))
+        self.stdout.write('Imported {} posts and {} comments.'.format(counts[Post], counts[Comment]))
+        call_command('render_markup', workers=options['workers'], stdout=self.stdout)
+
+    def load(self, lines, chunk_size):
+        """Create rows from lines, return number of created rows per model."""
+        authors = dict(User.objects.values_list('username', 'pk'))
+        chunks = {Post: [], Comment: []}
+        counts = {Post: 0, Comment: 0}
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+                if not isinstance(row, dict):
+                    raise ValueError('expected object, got {!r}'.format(row))
+                obj = self.build(row, authors)
+            except (ValueError, KeyError, TypeError) as error:
+                raise CommandError('Line {}: {!r}'.format(line_number, error))
+            model = type(obj)
+            if model is Comment and chunks[Post]:
+                counts[Post] += self.flush(Post, chunks[Post])
+            chunks[model].append((line_number, obj))
+            if len(chunks[model]) >= chunk_size:
+                counts[model] += self.flush(model, chunks[model])
+        for model in (Post, Comment):
+            counts[model] += self.flush(model, chunks[model])
+        return counts
+
+    def build(self, row, authors):
+        """Build unsaved model instance from a row."""
+        if row['type'] == 'post':
+            if row['author'] not in authors:
+                raise ValueError('unknown author {!r}'.format(row['author']))
+            return Post(id=row['id'], author_id=authors[row['author']], title=row['title'], text=row['text'],
+                        created_date=parse_date(row['created_date']),
+                        published_date=row['published_date'] and parse_date(row['published_date']),
+                        view_count=row.get('view_count', 0), popularity=row.get('popularity', 0))
+        if row['type'] == 'comment':
+            return Comment(id=row['id'], post_id=row['post'], author=row['author'], text=row['text'],
+                           created_date=parse_date(row['created_date']), is_approved=row['is_approved'])
+        raise ValueError('unknown type {!r}'.format(row['type']))
+
+    def flush(self, model, chunk):
+        """Check chunk of (line number, row) pairs, create rows with one query and empty the chunk."""
+        if not chunk:
+            return 0
+        existing = set(model.objects.filter(pk__in=[obj.pk for _, obj in chunk]).values_list('pk', flat=True))
+        for line_number, obj in chunk:
+            if obj.pk in existing:
+                raise CommandError('Line {}: {} {} already exists'.format(line_number, model._meta.model_name, obj.pk))
+        if model is Comment:
+            post_pks = {obj.post_id for _, obj in chunk}
+            post_pks.difference_update(Post.objects.filter(pk__in=post_pks).values_list('pk', flat=True))
+            for line_number, obj in chunk:
+                if obj.post_id in post_pks:
+                    raise CommandError('Line {}: unknown post {}'.format(line_number, obj.post_id))
+        try:
+            model.objects.bulk_create([obj for _, obj in chunk])
+        except IntegrityError as error:
+            raise CommandError('Lines {}-{}: {!r}'.format(chunk[0][0], chunk[-1][0], error))
+        count = len(chunk)
+        del chunk[:]
+        return count
+
+    def reset_sequences(self):
+        """Move primary key sequences past imported ids, as loaddata does."""
+        connection = connections[Post.objects.db]
+        statements = connection.ops.sequence_reset_sql(no_style(), [Post, Comment])
+        if statements:
+            with transaction.atomic(), connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
+
+
+def parse_date(value):
+    """Parse date written by export_blog."""
+    date = parse_datetime(value)
+    if date is None:
+        raise ValueError('invalid date {!r}'.format(value))
+    return date
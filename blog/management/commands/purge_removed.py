@@ -0,0 +1,62 @@
+"""Delete removed posts and stale comments.
+
+- Command - purges rows in small batches, each in its own transaction.
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from blog.models import Post, Comment
+
+
+class Command(BaseCommand):
+    """Purge removed posts with their comments and old unapproved comments."""
+
+    help = 'Delete removed posts, their comments and old unapproved comments in batches.'
+
+    def add_arguments(self, parser):
+        """Describe command arguments."""
+        parser.add_argument('--batch-size', type=int, default=1000, dest='batch_size',
+                            help='Number of rows deleted in one transaction.')
+        parser.add_argument('--unapproved-days', type=int, default=None, dest='unapproved_days',
+                            help='Also delete unapproved comments older than this number of days.')
+
+    def handle(self, *args, **options):
+        """Purge comments first, so removed posts are deleted without cascading."""
+        batch_size = options['batch_size']
+        count = self.purge_comments(Comment.objects.filter(post__deleted_date__isnull=False), batch_size)
+        self.stdout.write('Deleted {} comments of removed posts.'.format(count))
+        count = self.purge_posts(batch_size)
+        self.stdout.write('Deleted {} removed posts.'.format(count))
+        if options['unapproved_days'] is not None:
+            created_before = timezone.now() - timedelta(days=options['unapproved_days'])
+            queryset = Comment.objects.filter(is_approved=False, created_date__lt=created_before)
+            count = self.purge_comments(queryset, batch_size)
+            self.stdout.write('Deleted {} unapproved comments.'.format(count))
+
+    def purge_comments(self, queryset, batch_size):
+        """Delete comments by batches of primary keys."""
+        count = 0
+        while True:
+            pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                return count
+            with transaction.atomic():
+                Comment.objects.filter(pk__in=pks).delete()
+            count += len(pks)
+
+    def purge_posts(self, batch_size):
+        """Delete removed posts with comments left after purge_comments, e.g. added while it ran."""
+        count = 0
+        while True:
+            pks = list(Post.objects.removed().values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                return count
+            with transaction.atomic():
+                Comment.objects.filter(post__in=pks).delete()
+                # Collector loads posts to delete, so load only their keys and not texts
+                Post.objects.filter(pk__in=pks).only('pk').delete()
+            count += len(pks)
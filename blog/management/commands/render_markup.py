@@ -0,0 +1,60 @@
+"""Render stored HTML of posts and comments.
+
+- Command - renders rows with outdated HTML using a process pool.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog import markup
+from blog.models import Post, Comment
+
+
+class Command(BaseCommand):
+    """Backfill ``text_html`` for rows rendered by an older markup version."""
+
+    help = 'Render HTML of posts and comments which is missing or outdated.'
+
+    def add_arguments(self, parser):
+        """Describe command arguments."""
+        parser.add_argument('--all', action='store_true', dest='all', default=False,
+                            help='Re-render every row, not only outdated ones.')
+        parser.add_argument('--batch-size', type=int, default=500, dest='batch_size',
+                            help='Number of rows loaded and rendered at once.')
+        parser.add_argument('--workers', type=int, default=None, dest='workers',
+                            help='Number of rendering processes, 1 renders in this process.')
+
+    def handle(self, *args, **options):
+        """Render posts, then comments."""
+        if options['workers'] == 1:
+            self.render_all(map, options)
+        else:
+            with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+                self.render_all(executor.map, options)
+
+    def render_all(self, map_func, options):
+        """Render every model with given map function."""
+        for model in (Post, Comment):
+            count = self.render_model(model, map_func, options['batch_size'], options['all'])
+            self.stdout.write('Rendered {} {} rows.'.format(count, model._meta.model_name))
+
+    def render_model(self, model, map_func, batch_size, render_all):
+        """Render rows of a model in batches ordered by primary key."""
+        version = markup.get_version()
+        queryset = model.objects.order_by('pk')
+        if not render_all:
+            queryset = queryset.exclude(render_version=version)
+        count, last_pk = 0, 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk).values_list('pk', 'text')[:batch_size])
+            if not batch:
+                return count
+            pks, texts = zip(*batch)
+            with transaction.atomic():
+                for pk, text, html in zip(pks, texts, map_func(markup.render, texts)):
+                    # Rows edited meanwhile are already rendered by save() and must not get HTML of old text
+                    model.objects.filter(pk=pk, text=text).update(text_html=html, render_version=version)
+            count += len(batch)
+            last_pk = pks[-1]
@@ -0,0 +1,57 @@
+"""Markup rendering for post and comment bodies.
+
+- render - turns raw text into HTML with the configured renderer;
+- linebreaks - default renderer, escapes text and wraps it into paragraphs;
+- markdown - optional renderer, requires ``markdown`` and ``bleach`` packages.
+
+The renderer is chosen by the ``BLOG_MARKUP_RENDERER`` setting (dotted path)
+and ``BLOG_MARKUP_VERSION`` must be bumped whenever it changes, so stored HTML
+gets re-rendered.
+"""
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.html import linebreaks as linebreaks_filter
+from django.utils.module_loading import import_string
+
+DEFAULT_RENDERER = 'blog.markup.linebreaks'
+DEFAULT_VERSION = 1
+
+# Markdown output is cleaned to these tags, attributes and link schemes
+MARKDOWN_TAGS = [
+    'a', 'abbr', 'blockquote', 'br', 'code', 'em', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr',
+    'li', 'ol', 'p', 'pre', 'strong', 'ul',
+]
+MARKDOWN_ATTRIBUTES = {'a': ['href', 'title'], 'abbr': ['title']}
+MARKDOWN_PROTOCOLS = ['http', 'https', 'mailto']
+
+
+def linebreaks(text):
+    """Render text the way ``linebreaks`` template filter does."""
+    return linebreaks_filter(text, autoescape=True)
+
+
+def markdown(text):
+    """Render text as Markdown, then clean HTML from unsafe tags and links."""
+    try:
+        import bleach
+        import markdown as markdown_lib
+    except ImportError:
+        raise ImproperlyConfigured('Install "markdown" and "bleach" packages to use Markdown renderer.')
+    return bleach.clean(markdown_lib.markdown(text), tags=MARKDOWN_TAGS, attributes=MARKDOWN_ATTRIBUTES,
+                        protocols=MARKDOWN_PROTOCOLS)
+
+
+def get_renderer():
+    """Return renderer function configured in settings."""
+    return import_string(getattr(settings, 'BLOG_MARKUP_RENDERER', DEFAULT_RENDERER))
+
+
+def get_version():
+    """Return current version of rendered markup."""
+    return getattr(settings, 'BLOG_MARKUP_VERSION', DEFAULT_VERSION)
+
+
+def render(text):
+    """Render text into HTML."""
+    return get_renderer()(text)
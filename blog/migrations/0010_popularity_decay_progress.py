@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_popularity_decay'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='popularitydecay',
+            name='factor',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='popularitydecay',
+            name='last_pk',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
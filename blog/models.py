@@ -1,17 +1,80 @@
 """DB models.
 
+- RenderedText - keeps pre-rendered HTML of a text field;
+- PostQuerySet - filters posts by their deletion state;
 - Post - represents a post in a blog;
+- Comment - represents a comment to post;
+- PopularityDecay - remembers when popularity of posts was decayed last time.
 """
 
 from django.db import models
 from django.utils import timezone
+from django.utils.safestring import mark_safe
 
+from . import markup
 
-class Post(models.Model):
+
+class RenderedText(models.Model):
+    """Abstract model storing ``text`` rendered into HTML.
+
+    HTML is rendered on save and re-rendered lazily when markup version changes.
+    Fields: text_html, render_version
+    Methods: render_text, rendered_text
+    """
+
+    text_html = models.TextField(blank=True, editable=False)
+    render_version = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    class Meta:
+        """Metadata for rendered text."""
+
+        abstract = True
+
+    def render_text(self):
+        """Render text into HTML, return list of updated field names."""
+        self.text_html = markup.render(self.text)
+        self.render_version = markup.get_version()
+        return ['text_html', 'render_version']
+
+    def save(self, *args, **kwargs):
+        """Render text before saving."""
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'text' in update_fields:
+            rendered_fields = self.render_text()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields).union(rendered_fields)
+        super().save(*args, **kwargs)
+
+    @property
+    def rendered_text(self):
+        """Return HTML safe for templates, re-render it if it is stale."""
+        if self.render_version != markup.get_version():
+            fields = self.render_text()
+            if self.pk is not None:
+                # Text could be edited since this instance was loaded, keep HTML rendered on that save
+                type(self).objects.filter(pk=self.pk, text=self.text).update(
+                    **{name: getattr(self, name) for name in fields})
+        return mark_safe(self.text_html)
+
+
+class PostQuerySet(models.QuerySet):
+    """Queryset for posts."""
+
+    def alive(self):
+        """Return posts which are not removed."""
+        return self.filter(deleted_date__isnull=True)
+
+    def removed(self):
+        """Return posts which are removed and wait for purging."""
+        return self.filter(deleted_date__isnull=False)
+
+
+class Post(RenderedText):
     """Represent a post in a blog.
 
-    Fields: author, title, text, created_date, published_date
-    Methods: publish, __str__
+    Fields: author, title, text, created_date, published_date, deleted_date,
+    updated_date, view_count, popularity
+    Methods: publish, remove, __str__
     """
 
     author = models.ForeignKey('auth.User')
@@ -21,12 +84,26 @@ class Post(models.Model):
             default=timezone.now)
     published_date = models.DateTimeField(
             blank=True, null=True)
+    deleted_date = models.DateTimeField(
+            blank=True, null=True, db_index=True, editable=False)
+    # Changes on every save, marks changed posts for cached sitemaps
+    updated_date = models.DateTimeField(auto_now=True)
+    view_count = models.PositiveIntegerField(default=0, editable=False)
+    # Views decayed over time by decay_popularity command
+    popularity = models.FloatField(default=0, db_index=True, editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     def publish(self):
         """Publish this post."""
         self.published_date = timezone.now()
         self.save()
 
+    def remove(self):
+        """Hide this post, it is deleted later by purge_removed command."""
+        self.deleted_date = timezone.now()
+        self.save(update_fields=['deleted_date', 'updated_date'])
+
     def __str__(self):
         """Show post title."""
         return self.title
@@ -37,7 +114,7 @@ class Post(models.Model):
         return self.comments.filter(is_approved=True)
 
 
-class Comment(models.Model):
+class Comment(RenderedText):
     """Represents a comment to post."""
 
     post = models.ForeignKey('Post', related_name='comments')
@@ -46,6 +123,12 @@ class Comment(models.Model):
     created_date = models.DateTimeField(default=timezone.now)
     is_approved = models.BooleanField(default=False)
 
+    class Meta:
+        """Metadata for comment."""
+
+        # Used by purge_removed to find old unapproved comments
+        index_together = [('is_approved', 'created_date')]
+
     def approve(self):
         """Approve comment."""
         self.is_approved = True
@@ -54,3 +137,19 @@ class Comment(models.Model):
     def __str__(self):
         """Represent a comment as a string by its text."""
         return self.text
+
+
+class PopularityDecay(models.Model):
+    """Single row with progress of popularity decay of posts.
+
+    Fields: decayed_date - time up to which popularity is decayed,
+    factor - factor of unfinished decay run, last_pk - last post decayed by it
+    """
+
+    decayed_date = models.DateTimeField(default=timezone.now)
+    factor = models.FloatField(blank=True, null=True)
+    last_pk = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        """Show time of the last decay."""
+        return str(self.decayed_date)
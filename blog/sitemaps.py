@@ -0,0 +1,99 @@
+"""Sitemaps of published posts.
+
+- shard_states - returns lastmod and size of every shard with published posts;
+- shard_state - returns size and change marker of one shard;
+- index - streams sitemap index with one entry per shard;
+- shard - streams sitemap of posts in a shard, caching it by chunks.
+
+Shards are fixed ranges of ``SHARD_SIZE`` primary keys, so a post always stays
+in the same shard and a shard never has more URLs than sitemaps allow.
+Cached chunks are keyed by the state of the shard read from database on every
+request: the number of its published posts, which grows when a scheduled post
+goes live, and the number and the latest ``updated_date`` of all its posts,
+removed ones included, which change on any save, removal, purge or import.
+So any change of shard posts is seen by all processes at once, with any cache
+backend, and nothing has to be invalidated. A chunk is a few hundred kilobytes,
+which fits memcached item size limit.
+"""
+
+from itertools import count
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.db.models import Count, F, Max
+from django.utils import timezone
+
+from .models import Post
+
+SHARD_SIZE = 50000
+CHUNK_SIZE = 2000
+XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+def published_posts():
+    """Return posts visible to crawlers."""
+    return Post.objects.alive().filter(published_date__lte=timezone.now())
+
+
+def shard_range(queryset, number):
+    """Filter posts of a shard."""
+    return queryset.filter(pk__gt=number * SHARD_SIZE, pk__lte=(number + 1) * SHARD_SIZE)
+
+
+def shard_states():
+    """Return (number, lastmod, post count) of shards with published posts with one grouped query."""
+    return (
+        published_posts()
+        .annotate(shard=(F('pk') - 1) / SHARD_SIZE)
+        .values_list('shard')
+        .annotate(Max('published_date'), Count('pk'))
+        .order_by('shard')
+    )
+
+
+def shard_state(number):
+    """Return (published post count, change marker) of a shard."""
+    published_count = shard_range(published_posts(), number).count()
+    changes = shard_range(Post.objects.all(), number).aggregate(Max('updated_date'), Count('pk'))
+    updated_date = changes['updated_date__max']
+    return published_count, '{}-{}'.format(changes['pk__count'], updated_date and updated_date.timestamp())
+
+
+def index(request):
+    """Yield sitemap index, lastmod of a shard is the latest publication in it."""
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{}">\n'.format(XMLNS)
+    for number, lastmod, _ in shard_states().iterator():
+        location = request.build_absolute_uri(reverse('sitemap_shard', kwargs={'number': number}))
+        yield '<sitemap><loc>{}</loc><lastmod>{}</lastmod></sitemap>\n'.format(escape(location), lastmod.isoformat())
+    yield '</sitemapindex>\n'
+
+
+def shard(request, number, state):
+    """Yield sitemap of a shard, loading posts in chunks ordered by primary key.
+
+    Chunks are cached under keys built from shard state, see module docstring.
+    """
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{}">\n'.format(XMLNS)
+    location = escape(request.build_absolute_uri(reverse('post_detail', kwargs={'pk': 0})))
+    location_start, location_end = location.rsplit('/0/', 1)
+    posts = shard_range(published_posts(), number).order_by('pk').values_list('pk', 'published_date')
+    key_prefix = 'blog:sitemap:{}:{}:{}:{}'.format(location_start, number, *state)
+    last_pk = number * SHARD_SIZE
+    for chunk_number in count():
+        key = '{}:{}'.format(key_prefix, chunk_number)
+        chunk = cache.get(key)
+        if chunk is None:
+            rows = list(posts.filter(pk__gt=last_pk)[:CHUNK_SIZE])
+            content = ''.join(
+                '<url><loc>{}/{}/{}</loc><lastmod>{}</lastmod></url>\n'.format(
+                    location_start, pk, location_end, published_date.isoformat())
+                for pk, published_date in rows)
+            chunk = content, rows[-1][0] if rows else None
+            cache.set(key, chunk, getattr(settings, 'BLOG_SITEMAP_CACHE_TIMEOUT', 3600))
+        content, last_pk = chunk
+        if last_pk is None:
+            break
+        yield content
+    yield '</urlset>\n'
@@ -0,0 +1,274 @@
+"""Tests for management commands."""
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog import markup
+from blog.models import Post, Comment, PopularityDecay
+
+
+class RenderMarkupCommandTest(TestCase):
+    """Tests for render_markup command."""
+
+    def setUp(self):
+        """Create rows with outdated HTML."""
+        self.user = User.objects.create(username='testuser')
+        self.posts = [Post.objects.create(author=self.user, title='Test', text='Post {}'.format(i)) for i in range(3)]
+        self.comment = Comment.objects.create(post=self.posts[0], author='testuser', text='Comment')
+        Post.objects.update(text_html='', render_version=0)
+        Comment.objects.update(text_html='', render_version=0)
+
+    def tearDown(self):
+        """Clean test data."""
+        del self.user
+        del self.posts
+        del self.comment
+
+    def assertRendered(self):
+        """Check that all rows have fresh HTML."""
+        for post in self.posts:
+            post.refresh_from_db()
+            self.assertEqual((post.text_html, post.render_version), ('<p>{}</p>'.format(post.text), 1))
+        self.comment.refresh_from_db()
+        self.assertEqual((self.comment.text_html, self.comment.render_version), ('<p>Comment</p>', 1))
+
+    def test_render_in_process(self):
+        """Outdated rows are rendered in batches."""
+        out = StringIO()
+        call_command('render_markup', workers=1, batch_size=2, stdout=out)
+        self.assertRendered()
+        self.assertIn('Rendered 3 post rows.', out.getvalue())
+        self.assertIn('Rendered 1 comment rows.', out.getvalue())
+        out = StringIO()
+        call_command('render_markup', workers=1, stdout=out)
+        self.assertIn('Rendered 0 post rows.', out.getvalue())
+        call_command('render_markup', workers=1, all=True, stdout=out)
+        self.assertIn('Rendered 3 post rows.', out.getvalue())
+
+    def test_render_edited_meanwhile(self):
+        """Rows edited while their batch is rendered keep HTML of the new text."""
+        post = self.posts[0]
+        render = markup.render
+
+        def render_and_edit(text):
+            if text == post.text:
+                edited_post = Post.objects.get(pk=post.pk)
+                edited_post.text = 'New text'
+                edited_post.save()
+            return render(text)
+
+        with patch('blog.markup.render', render_and_edit):
+            call_command('render_markup', workers=1, stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual((post.text, post.text_html, post.render_version), ('New text', '<p>New text</p>', 1))
+
+    def test_render_with_pool(self):
+        """Rows are rendered by worker processes."""
+        call_command('render_markup', workers=2, stdout=StringIO())
+        self.assertRendered()
+
+
+class PurgeRemovedCommandTest(TestCase):
+    """Tests for purge_removed command."""
+
+    def setUp(self):
+        """Create removed and alive posts with comments."""
+        self.user = User.objects.create(username='testuser')
+        self.removed_post = Post.objects.create(author=self.user, title='Removed', text='Text')
+        self.post = Post.objects.create(author=self.user, title='Alive', text='Text')
+        for post in (self.removed_post, self.post):
+            for i in range(5):
+                Comment.objects.create(post=post, author='testuser', text='Comment {}'.format(i), is_approved=True)
+        self.old_comment = Comment.objects.create(post=self.post, author='testuser', text='Old',
+                                                  created_date=timezone.now() - timedelta(days=40))
+        self.new_comment = Comment.objects.create(post=self.post, author='testuser', text='New')
+        self.removed_post.remove()
+
+    def tearDown(self):
+        """Clean test data."""
+        del self.user
+        del self.removed_post
+        del self.post
+        del self.old_comment
+        del self.new_comment
+
+    def test_purge_removed(self):
+        """Removed posts and their comments are deleted, others are kept."""
+        out = StringIO()
+        call_command('purge_removed', batch_size=2, stdout=out)
+        self.assertIn('Deleted 5 comments of removed posts.', out.getvalue())
+        self.assertIn('Deleted 1 removed posts.', out.getvalue())
+        self.assertNotIn('unapproved', out.getvalue())
+        self.assertListEqual(list(Post.objects.all()), [self.post])
+        self.assertEqual(Comment.objects.count(), 7)
+
+    def test_purge_removed_loads_keys(self):
+        """Removed posts are deleted without loading their texts."""
+        with CaptureQueriesContext(connection) as queries:
+            call_command('purge_removed', stdout=StringIO())
+        self.assertFalse([query['sql'] for query in queries if '"blog_post"."text"' in query['sql']])
+        self.assertFalse(Post.objects.filter(pk=self.removed_post.pk).exists())
+
+    def test_purge_unapproved(self):
+        """Unapproved comments older than retention period are deleted."""
+        out = StringIO()
+        call_command('purge_removed', unapproved_days=30, stdout=out)
+        self.assertIn('Deleted 1 unapproved comments.', out.getvalue())
+        self.assertFalse(Comment.objects.filter(pk=self.old_comment.pk).exists())
+        self.assertTrue(Comment.objects.filter(pk=self.new_comment.pk).exists())
+
+
+class ExportImportCommandTest(TestCase):
+    """Tests for export_blog and import_blog commands."""
+
+    def setUp(self):
+        """Create posts with comments and a file for export."""
+        self.user = User.objects.create(username='testuser')
+        self.post = Post.objects.create(author=self.user, title='Test', text='Post text',
+                                        published_date=timezone.now(), view_count=7, popularity=2.5)
+        self.draft = Post.objects.create(author=self.user, title='Draft', text='Draft text')
+        self.removed_post = Post.objects.create(author=self.user, title='Removed', text='Text')
+        for post in (self.post, self.removed_post):
+            Comment.objects.create(post=post, author='reader', text='Comment', is_approved=True)
+        self.removed_post.remove()
+        handle, self.path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(handle)
+
+    def tearDown(self):
+        """Clean test data."""
+        os.remove(self.path)
+        del self.user
+        del self.post
+        del self.draft
+        del self.removed_post
+
+    def test_export(self):
+        """Alive posts are exported before their comments, one per line."""
+        out = StringIO()
+        call_command('export_blog', chunk_size=1, stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        comment = self.post.comments.get()
+        self.assertListEqual([(row['type'], row['id']) for row in rows],
+                             [('post', self.post.pk), ('post', self.draft.pk), ('comment', comment.pk)])
+        self.assertEqual(rows[0]['author'], 'testuser')
+        self.assertIsNone(rows[1]['published_date'])
+
+    def test_export_import(self):
+        """Exported rows are imported back with rendered text."""
+        call_command('export_blog', output=self.path, stdout=StringIO())
+        fields = ('pk', 'title', 'published_date', 'view_count', 'popularity')
+        expected_posts = list(Post.objects.alive().order_by('pk').values_list(*fields))
+        expected_comments = list(self.post.comments.values_list('pk', 'post', 'author', 'text', 'is_approved'))
+        Post.objects.all().delete()
+        out = StringIO()
+        call_command('import_blog', self.path, chunk_size=1, workers=1, stdout=out)
+        self.assertIn('Imported 2 posts and 1 comments.', out.getvalue())
+        self.assertListEqual(list(Post.objects.order_by('pk').values_list(*fields)), expected_posts)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).view_count, 7)
+        self.assertListEqual(list(Comment.objects.values_list('pk', 'post', 'author', 'text', 'is_approved')),
+                             expected_comments)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).text_html, '<p>Post text</p>')
+        self.assertEqual(Comment.objects.get().text_html, '<p>Comment</p>')
+        new_post = Post.objects.create(author=self.user, title='New', text='Text')
+        self.assertGreater(new_post.pk, self.removed_post.pk)
+
+    def test_import_existing_rows(self):
+        """Import of rows which already exist fails and leaves no rows behind."""
+        call_command('export_blog', output=self.path, stdout=StringIO())
+        self.draft.delete()
+        with self.assertRaisesRegex(CommandError, 'Line 1: post {} already exists'.format(self.post.pk)):
+            call_command('import_blog', self.path, stdout=StringIO())
+        self.assertFalse(Post.objects.filter(pk=self.draft.pk).exists())
+
+    def test_import_unknown_post(self):
+        """Import of comments to missing posts fails and is rolled back."""
+        call_command('export_blog', output=self.path, stdout=StringIO())
+        with open(self.path) as lines:
+            rows = lines.readlines()
+        with open(self.path, 'w') as lines:
+            lines.writelines(rows[1:])
+        Post.objects.all().delete()
+        with self.assertRaisesRegex(CommandError, 'Line 2: unknown post {}'.format(self.post.pk)):
+            call_command('import_blog', self.path, chunk_size=1, workers=1, stdout=StringIO())
+        self.assertFalse(Post.objects.exists())
+        with open(self.path, 'w') as lines:
+            lines.writelines(rows)
+        call_command('import_blog', self.path, workers=1, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_import_invalid_rows(self):
+        """Rows which are not objects or have invalid dates are reported with line number."""
+        call_command('export_blog', output=self.path, stdout=StringIO())
+        with open(self.path) as lines:
+            rows = lines.readlines()
+        Post.objects.all().delete()
+        post = json.loads(rows[0])
+        post['created_date'] = 'yesterday'
+        for line, message in (('[1]', 'expected object'), ('null', 'expected object'),
+                              (json.dumps(post), "invalid date 'yesterday'")):
+            with open(self.path, 'w') as lines:
+                lines.writelines([rows[1], line + '\n'])
+            with self.assertRaisesRegex(CommandError, 'Line 2: .*{}'.format(message)):
+                call_command('import_blog', self.path, stdout=StringIO())
+            self.assertFalse(Post.objects.exists())
+
+    def test_import_unknown_author(self):
+        """Import fails on posts of unknown users."""
+        call_command('export_blog', output=self.path, stdout=StringIO())
+        Post.objects.all().delete()
+        self.user.delete()
+        with self.assertRaisesRegex(CommandError, 'Line 1: .*unknown author'):
+            call_command('import_blog', self.path, stdout=StringIO())
+
+
+class DecayPopularityCommandTest(TestCase):
+    """Tests for decay_popularity command."""
+
+    def setUp(self):
+        """Create posts with different popularity."""
+        self.user = User.objects.create(username='testuser')
+        self.posts = [Post.objects.create(author=self.user, title='Test', text='Text', popularity=popularity)
+                      for popularity in (8, 0.015, 0)]
+
+    def tearDown(self):
+        """Clean test data."""
+        del self.user
+        del self.posts
+
+    def test_decay(self):
+        """Popularity is halved after half-life passed since previous run, tiny popularity is reset."""
+        PopularityDecay.objects.create(pk=1, decayed_date=timezone.now() - timedelta(hours=2))
+        out = StringIO()
+        with self.settings(BLOG_POPULARITY_HALF_LIFE=2):
+            call_command('decay_popularity', batch_size=1, stdout=out)
+        self.assertIn('Decayed popularity of 2 posts', out.getvalue())
+        self.assertListEqual([round(Post.objects.get(pk=post.pk).popularity, 3) for post in self.posts], [4, 0, 0])
+        decay = PopularityDecay.objects.get()
+        self.assertGreater(decay.decayed_date, timezone.now() - timedelta(minutes=1))
+        self.assertEqual((decay.factor, decay.last_pk), (None, 0))
+
+    def test_decay_resume(self):
+        """Interrupted run is finished from the last decayed post before a new one starts."""
+        PopularityDecay.objects.create(pk=1, decayed_date=timezone.now(), factor=0.5, last_pk=self.posts[0].pk)
+        call_command('decay_popularity', stdout=StringIO())
+        self.assertEqual(round(Post.objects.get(pk=self.posts[0].pk).popularity, 3), 8)
+        self.assertEqual(Post.objects.get(pk=self.posts[1].pk).popularity, 0)
+        decay = PopularityDecay.objects.get()
+        self.assertEqual((decay.factor, decay.last_pk), (None, 0))
+
+    def test_decay_first_run(self):
+        """First run only remembers its time."""
+        call_command('decay_popularity', stdout=StringIO())
+        self.assertEqual(PopularityDecay.objects.count(), 1)
+        self.assertEqual(Post.objects.get(pk=self.posts[0].pk).popularity, 8)
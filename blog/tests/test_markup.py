@@ -0,0 +1,28 @@
+"""Tests for markup renderers."""
+from django.test import SimpleTestCase
+
+from blog import markup
+
+
+class MarkdownRendererTest(SimpleTestCase):
+    """Tests for Markdown renderer."""
+
+    def test_markdown(self):
+        """Markdown is rendered from raw text, not from escaped one."""
+        self.assertEqual(markup.markdown('> quote'), '<blockquote>\n<p>quote</p>\n</blockquote>')
+        self.assertEqual(markup.markdown('    a < b'), '<pre><code>a &lt; b\n</code></pre>')
+        self.assertEqual(markup.markdown('[link](https://example.com)'),
+                         '<p><a href="https://example.com">link</a></p>')
+
+    def test_markdown_javascript_link(self):
+        """Links with unsafe schemes lose their href."""
+        html = markup.markdown('[x](javascript:alert(document.cookie))')
+        self.assertNotIn('javascript:', html)
+        self.assertEqual(html, '<p><a>x</a></p>')
+
+    def test_markdown_script(self):
+        """Raw HTML tags outside of allowlist are escaped."""
+        html = markup.markdown('<script>alert(1)</script>\n\nText <img src=x onerror=alert(1)>')
+        self.assertNotIn('<script', html)
+        self.assertNotIn('<img', html)
+        self.assertIn('&lt;script&gt;alert(1)&lt;/script&gt;', html)
@@ -3,7 +3,7 @@ from datetime import datetime
 from unittest.mock import patch
 
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.utils import timezone
 
 from blog.models import Post, Comment
@@ -36,10 +36,47 @@ class ModelPostTest(TestCase):
                                                                  year=2017,
                                                                  tzinfo=timezone.get_current_timezone()))
 
+    def test_post_text_html_rerender_edited(self):
+        """Lazy re-rendering does not overwrite HTML of text edited meanwhile."""
+        Post.objects.filter(pk=self.test_post.pk).update(text_html='', render_version=0)
+        post = Post.objects.get(pk=self.test_post.pk)
+        edited_post = Post.objects.get(pk=self.test_post.pk)
+        edited_post.text = 'New text'
+        edited_post.save()
+        self.assertEqual(post.rendered_text, '<p>Test text</p>')
+        post = Post.objects.get(pk=self.test_post.pk)
+        self.assertEqual((post.text_html, post.render_version), ('<p>New text</p>', 1))
+
+    def test_post_remove(self):
+        """Removed post is kept until purged, but is not alive."""
+        updated_date = self.test_post.updated_date
+        self.test_post.remove()
+        self.assertIsNotNone(self.test_post.deleted_date)
+        self.assertGreater(Post.objects.get(pk=self.test_post.pk).updated_date, updated_date)
+        self.assertListEqual(list(Post.objects.alive()), [])
+        self.assertListEqual(list(Post.objects.removed()), [self.test_post])
+
     def test_post_rendering(self):
         """Post is rendered as its title."""
         self.assertEqual(str(self.test_post), self.test_post.title)
 
+    def test_post_text_html(self):
+        """Post text is escaped and rendered into HTML on save."""
+        self.test_post.text = 'First <b>line</b>\nSecond line'
+        self.test_post.save()
+        self.assertEqual(self.test_post.text_html, '<p>First &lt;b&gt;line&lt;/b&gt;<br />Second line</p>')
+        self.assertEqual(self.test_post.render_version, 1)
+
+    def test_post_text_html_rerender(self):
+        """Outdated post HTML is re-rendered and stored on access."""
+        Post.objects.filter(pk=self.test_post.pk).update(text_html='', render_version=0)
+        post = Post.objects.get(pk=self.test_post.pk)
+        self.assertEqual(post.rendered_text, '<p>Test text</p>')
+        with override_settings(BLOG_MARKUP_RENDERER='django.utils.html.escape', BLOG_MARKUP_VERSION=2):
+            self.assertEqual(post.rendered_text, 'Test text')
+        post = Post.objects.get(pk=self.test_post.pk)
+        self.assertEqual((post.text_html, post.render_version), ('Test text', 2))
+
 
 class ModelCommentTest(TestCase):
     """Tests for comments."""
@@ -57,6 +94,10 @@ class ModelCommentTest(TestCase):
         """Comment is rendered as its text."""
         self.assertEqual(str(self.test_comment), self.test_comment.text)
 
+    def test_comment_text_html(self):
+        """Comment text is rendered into HTML on save."""
+        self.assertEqual(self.test_comment.rendered_text, '<p>Test comment text</p>')
+
     def test_comment_approve(self):
         """Comment approved successfully."""
         self.assertFalse(self.test_comment.is_approved)
@@ -3,13 +3,18 @@ from datetime import datetime
 from unittest.mock import patch
 
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
-from django.test import TestCase, Client
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
+from blog.counters import post_views
 from blog.models import Post, Comment
 
 
+@override_settings(BLOG_VIEWS_FLUSH_INTERVAL=0)
 class ViewsTest(TestCase):
     """Tests for views."""
 
@@ -62,6 +67,7 @@ class ViewsTest(TestCase):
         self.assertContains(response, post)
         self.assertContains(response, past_post)
         self.assertNotContains(response, future_post)
+        self.assertContains(response, '<p>superText</p>', html=True)
 
     def test_detail_view(self):
         """Testing detail page when post is not exist and when it exists."""
@@ -71,6 +77,56 @@ class ViewsTest(TestCase):
         response = self.client.get(reverse('post_detail', kwargs={'pk': post.pk}))
         self.assertEqual(200, response.status_code)
 
+    def test_detail_view_count(self):
+        """Post views are counted and make post popular."""
+        post = Post.objects.create(author=self.user, title='Test', text='superText')
+        for _ in range(3):
+            self.client.get(reverse('post_detail', kwargs={'pk': post.pk}))
+        post.refresh_from_db()
+        self.assertEqual((post.view_count, post.popularity), (3, 3))
+
+    @override_settings(BLOG_VIEWS_FLUSH_INTERVAL=3600)
+    def test_detail_view_count_buffered(self):
+        """Post views are kept in memory until buffer is flushed."""
+        post = Post.objects.create(author=self.user, title='Test', text='superText')
+        post_views.flush()
+        for _ in range(3):
+            self.client.get(reverse('post_detail', kwargs={'pk': post.pk}))
+        post.refresh_from_db()
+        self.assertEqual(post.view_count, 0)
+        post_views.flush()
+        post.refresh_from_db()
+        self.assertEqual(post.view_count, 3)
+
+    @override_settings(BLOG_VIEWS_FLUSH_INTERVAL=3600)
+    @patch('blog.counters.UPDATE_BATCH_SIZE', 2)
+    def test_detail_view_count_batched(self):
+        """Buffered views of many posts are written by batched updates."""
+        posts = [Post.objects.create(author=self.user, title='Test', text='superText') for _ in range(3)]
+        post_views.flush()
+        for views, post in enumerate(posts, 1):
+            for _ in range(views):
+                self.client.get(reverse('post_detail', kwargs={'pk': post.pk}))
+        with CaptureQueriesContext(connection) as queries:
+            post_views.flush()
+        self.assertEqual(len([query for query in queries if 'UPDATE' in query['sql']]), 2)
+        self.assertListEqual([Post.objects.get(pk=post.pk).view_count for post in posts], [1, 2, 3])
+        self.assertListEqual([Post.objects.get(pk=post.pk).popularity for post in posts], [1, 2, 3])
+
+    def test_popular_view(self):
+        """Published posts are ordered by popularity."""
+        tz = timezone.get_current_timezone()
+        published_date = datetime(day=1, month=3, year=2016, tzinfo=tz)
+        post = Post.objects.create(author=self.user, title='Test', text='superText',
+                                   published_date=published_date, popularity=1)
+        popular_post = Post.objects.create(author=self.user, title='popular_test', text='superText',
+                                           published_date=published_date, popularity=5)
+        draft = Post.objects.create(author=self.user, title='draft_test', text='superText', popularity=10)
+        response = self.client.get(reverse('post_popular'))
+        self.assertEqual(200, response.status_code)
+        self.assertListEqual(list(response.context['posts']), [popular_post, post])
+        self.assertNotContains(response, draft)
+
     def test_post_new_view(self):
         """Testing new post view: before and after login; post creating."""
         response = self.client.get(reverse('post_new'))
@@ -143,6 +199,9 @@ class ViewsTest(TestCase):
         response = self.client.get(reverse('post_draft_list'), follow=True)
         self.assertNotContains(response, post)
         self.assertContains(response, other_post)
+        self.assertTrue(Post.objects.removed().filter(pk=post.pk).exists())
+        response = self.client.get(reverse('post_detail', kwargs={'pk': post.pk}))
+        self.assertEqual(404, response.status_code)
 
     def test_add_comment(self):
         """Testing adding comment to post."""
@@ -183,3 +242,85 @@ class ViewsTest(TestCase):
         response = self.client.get(reverse('post_detail', kwargs={'pk': self.post.pk}), follow=True)
         self.assertNotContains(response, self.comment)
         self.assertContains(response, self.other_comment)
+
+
+@patch('blog.sitemaps.SHARD_SIZE', 2)
+@patch('blog.sitemaps.CHUNK_SIZE', 1)
+class SitemapViewsTest(TestCase):
+    """Tests for sitemap views."""
+
+    def setUp(self):
+        """Create published posts in two shards, a draft and a removed post."""
+        cache.clear()
+        self.user = User.objects.create(username='testuser')
+        tz = timezone.get_current_timezone()
+        self.posts = [
+            Post.objects.create(author=self.user, title='Test {}'.format(day), text='superText',
+                                published_date=datetime(day=day, month=3, year=2016, tzinfo=tz))
+            for day in range(1, 4)
+        ]
+        self.draft = Post.objects.create(author=self.user, title='draft_test', text='superText')
+        self.removed_post = Post.objects.create(author=self.user, title='removed_test', text='superText',
+                                                published_date=datetime(day=1, month=4, year=2016, tzinfo=tz))
+        self.removed_post.remove()
+
+    def tearDown(self):
+        """Clean test data."""
+        cache.clear()
+        del self.user
+        del self.posts
+        del self.draft
+        del self.removed_post
+
+    def get_content(self, url):
+        """Return content of streaming response."""
+        response = self.client.get(url)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('application/xml', response['Content-Type'])
+        return b''.join(response.streaming_content).decode()
+
+    def test_sitemap_index(self):
+        """Index lists shards with published posts and their last publication date."""
+        content = self.get_content(reverse('sitemap_index'))
+        self.assertIn('<loc>http://testserver/sitemap-0.xml</loc><lastmod>{}</lastmod>'.format(
+            self.posts[1].published_date.astimezone(timezone.utc).isoformat()), content)
+        self.assertIn('<loc>http://testserver/sitemap-1.xml</loc><lastmod>{}</lastmod>'.format(
+            self.posts[2].published_date.astimezone(timezone.utc).isoformat()), content)
+        self.assertNotIn('sitemap-2.xml', content)
+
+    def test_sitemap_shard(self):
+        """Shard lists published posts in its range."""
+        content = self.get_content(reverse('sitemap_shard', kwargs={'number': 0}))
+        self.assertEqual(content.count('<url>'), 2)
+        self.assertIn('<loc>http://testserver{}</loc>'.format(
+            reverse('post_detail', kwargs={'pk': self.posts[0].pk})), content)
+        content = self.get_content(reverse('sitemap_shard', kwargs={'number': 1}))
+        self.assertEqual(content.count('<url>'), 1)
+        self.assertNotIn('<loc>http://testserver{}</loc>'.format(
+            reverse('post_detail', kwargs={'pk': self.draft.pk})), content)
+
+    def test_sitemap_shard_not_found(self):
+        """Shards without published posts do not exist."""
+        response = self.client.get(reverse('sitemap_shard', kwargs={'number': 2}))
+        self.assertEqual(404, response.status_code)
+
+    def test_sitemap_cache(self):
+        """Sitemap is cached until posts in its range change."""
+        url = reverse('sitemap_shard', kwargs={'number': 0})
+        content = self.get_content(url)
+        with self.assertNumQueries(2):
+            self.assertEqual(self.get_content(url), content)
+        self.get_content(reverse('sitemap_shard', kwargs={'number': 1}))
+        self.posts[1].remove()
+        self.assertEqual(self.get_content(url).count('<url>'), 1)
+        with self.assertNumQueries(2):
+            self.get_content(reverse('sitemap_shard', kwargs={'number': 1}))
+
+    def test_sitemap_cache_edited_post(self):
+        """Cached sitemap changes when publication date of a non-latest post is edited."""
+        url = reverse('sitemap_shard', kwargs={'number': 0})
+        self.get_content(url)
+        post = self.posts[0]
+        post.published_date = datetime(day=1, month=1, year=2015, tzinfo=timezone.utc)
+        post.save()
+        self.assertIn('<lastmod>{}</lastmod>'.format(post.published_date.isoformat()), self.get_content(url))
@@ -3,27 +3,43 @@
 - post_list - returns post list;
 """
 
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from .models import Post, Comment
 from django.utils import timezone
 from .forms import PostForm, CommentForm
+from .counters import post_views
+from . import sitemaps
 from django.contrib.auth.decorators import login_required
 # Create your views here.
 
+POPULAR_POSTS_COUNT = 10
+
 
 def post_list(request):
     """Show posts, which are published, ordered by published date."""
     posts = (
-        Post.objects
+        Post.objects.alive()
         .filter(published_date__lte=timezone.now())
         .order_by('published_date')
     )
     return render(request, 'blog/post_list.html', {'posts': posts})
 
 
+def post_popular(request):
+    """Show most popular published posts."""
+    posts = (
+        Post.objects.alive()
+        .filter(published_date__lte=timezone.now())
+        .order_by('-popularity')[:POPULAR_POSTS_COUNT]
+    )
+    return render(request, 'blog/post_list.html', {'posts': posts})
+
+
 def post_detail(request, pk):
     """Show post details."""
-    post = get_object_or_404(Post, pk=pk)
+    post = get_object_or_404(Post.objects.alive(), pk=pk)
+    post_views.add(post.pk)
     return render(request, 'blog/post_detail.html', {'post': post})
 
 
@@ -45,7 +61,7 @@ def post_new(request):
 @login_required
 def post_edit(request, pk):
     """Edit existing post."""
-    post = get_object_or_404(Post, pk=pk)
+    post = get_object_or_404(Post.objects.alive(), pk=pk)
     if request.method == 'POST':
         form = PostForm(request.POST, instance=post)
         if form.is_valid():
@@ -62,7 +78,7 @@ def post_edit(request, pk):
 def post_draft_list(request):
     """Unpublished posts."""
     posts = (
-        Post.objects
+        Post.objects.alive()
         .filter(published_date__isnull=True)
         .order_by('created_date')
     )
@@ -72,22 +88,22 @@ def post_draft_list(request):
 @login_required
 def post_publish(request, pk):
     """Publish post."""
-    post = get_object_or_404(Post, pk=pk)
+    post = get_object_or_404(Post.objects.alive(), pk=pk)
     post.publish()
     return redirect('post_detail', pk=pk)
 
 
 @login_required
 def post_remove(request, pk):
-    """Delete post."""
-    post = get_object_or_404(Post, pk=pk)
-    post.delete()
+    """Hide post, it is deleted later by purge_removed command."""
+    post = get_object_or_404(Post.objects.alive(), pk=pk)
+    post.remove()
     return redirect('post_list')
 
 
 def add_comment(request, pk):
     """Add comment to post."""
-    post = get_object_or_404(Post, pk=pk)
+    post = get_object_or_404(Post.objects.alive(), pk=pk)
     if request.method == 'POST':
         form = CommentForm(request.POST)
         if form.is_valid():
@@ -103,7 +119,7 @@ def add_comment(request, pk):
 @login_required
 def comment_approve(request, pk):
     """Approve (publish) comment."""
-    comment = get_object_or_404(Comment, pk=pk)
+    comment = get_object_or_404(Comment, pk=pk, post__deleted_date__isnull=True)
     comment.approve()
     return redirect('post_detail', pk=comment.post.pk)
 
@@ -111,7 +127,21 @@ def comment_approve(request, pk):
 @login_required
 def comment_remove(request, pk):
     """Delete comment."""
-    comment = get_object_or_404(Comment, pk=pk)
+    comment = get_object_or_404(Comment, pk=pk, post__deleted_date__isnull=True)
     post_pk = comment.post.pk
     comment.delete()
     return redirect('post_detail', pk=post_pk)
+
+
+def sitemap_index(request):
+    """Stream sitemap index."""
+    return StreamingHttpResponse(sitemaps.index(request), content_type='application/xml')
+
+
+def sitemap_shard(request, number):
+    """Stream sitemap of posts in a shard."""
+    number = int(number)
+    state = sitemaps.shard_state(number)
+    if not state[0]:
+        raise Http404('No published posts in sitemap shard.')
+    return StreamingHttpResponse(sitemaps.shard(request, number, state), content_type='application/xml')
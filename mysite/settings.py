@@ -106,6 +106,18 @@ STATIC_ROOT = STATIC_ROOT_DIR()
 
 LOGIN_REDIRECT_URL = '/'
 
+# Markup renderer for posts and comments, bump version after changing renderer
+BLOG_MARKUP_RENDERER = env('BLOG_MARKUP_RENDERER', default='blog.markup.linebreaks')
+BLOG_MARKUP_VERSION = env.int('BLOG_MARKUP_VERSION', default=1)
+
+# Post views are buffered in every worker and written at most once per interval
+BLOG_VIEWS_FLUSH_INTERVAL = env.int('BLOG_VIEWS_FLUSH_INTERVAL', default=10)
+BLOG_VIEWS_FLUSH_SIZE = env.int('BLOG_VIEWS_FLUSH_SIZE', default=1000)
+BLOG_POPULARITY_HALF_LIFE = env.float('BLOG_POPULARITY_HALF_LIFE', default=24.0)  # hours
+
+# Sitemap chunks are cached until posts of their shard change, but no longer than timeout (seconds)
+BLOG_SITEMAP_CACHE_TIMEOUT = env.int('BLOG_SITEMAP_CACHE_TIMEOUT', default=3600)
+
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 
 LOGGING = {